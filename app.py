@@ -1,9 +1,10 @@
 """Streamlit main application for Value Tree Generator."""
 
 import streamlit as st
+from contextlib import ExitStack
 from pathlib import Path
 
-from config import DEFAULT_THRESHOLD, EXCEL_FILE_PATH
+from config import DEFAULT_THRESHOLD, EXCEL_FILE_PATH, MAX_RENDER_NODES
 from data_loader import DataLoader
 from assembler import ValueTreeAssembler
 from models import ValueTreeNode, ValueTree
@@ -16,6 +17,29 @@ st.set_page_config(
     layout="wide"
 )
 
+# Per-level display icons, hoisted so render calls don't rebuild the dict
+LEVEL_ICONS = {
+    "Lever": "🎯",
+    "Business_Objective": "📊",
+    "Value_Driver": "⚡",
+    "KPI": "📈"
+}
+DEFAULT_ICON = "📌"
+
+# Precomputed indent strings for the flat view, indexed by depth
+INDENT_TREE = tuple("│   " * i for i in range(32))
+
+# Precompiled HTML templates for the visual-tree boxes
+LEVER_TPL = '<div class="lever-box">{}</div>'
+BO_TPL = '<div class="bo-box">{}</div>'
+VD_TPL = '<div class="vd-box">{}</div>'
+KPI_TPL = '<span class="kpi-item">{}</span>'
+
+
+def _tree_indent(level: int) -> str:
+    """Return the flat-view indent for a depth, falling back past the table."""
+    return INDENT_TREE[level] if level < len(INDENT_TREE) else "│   " * level
+
 
 @st.cache_resource
 def load_data() -> DataLoader:
@@ -25,130 +49,123 @@ def load_data() -> DataLoader:
     return loader
 
 
+@st.cache_resource
+def get_assembler() -> ValueTreeAssembler:
+    """Create and cache the assembler bound to the loaded data."""
+    return ValueTreeAssembler(load_data())
+
+
+@st.cache_data(show_spinner=False)
+def _assemble_cached(_assembler: ValueTreeAssembler, value_intent: str,
+                     industry: str, function: str, threshold: int,
+                     data_version: int) -> ValueTree:
+    """Assemble a tree once per unique context.
+
+    The assembler is underscore-prefixed so Streamlit skips hashing it
+    (and the DataFrames it holds); the cheap data_version token stands in
+    for it in the cache key and is bumped on Reload Data.
+    """
+    return _assembler.assemble_value_tree(
+        value_intent=value_intent,
+        industry=industry,
+        function=function,
+        threshold=threshold
+    )
+
+
+
+
 def render_tree_node(node: ValueTreeNode, level: int = 0, default_expanded: bool = True):
-    """Recursively render a tree node with its children."""
-    # Visual styling based on level
-    level_icons = {
-        "Lever": "🎯",
-        "Business_Objective": "📊",
-        "Value_Driver": "⚡",
-        "KPI": "📈"
-    }
-
-    icon = level_icons.get(node.level, "📌")
-
-    # For leaf nodes or nodes without children, just display
-    if not node.children:
-        st.markdown(
-            f"{icon} **{node.name}**",
-            unsafe_allow_html=True
-        )
-        if node.description:
-            st.markdown(
-                f"&nbsp;&nbsp;&nbsp;<small style='color: #666;'>{node.description}</small>",
-                unsafe_allow_html=True
-            )
-    else:
-        # Use expander for nodes with children
-        with st.expander(f"{icon} {node.name}", expanded=default_expanded):
-            if node.description:
-                st.caption(node.description)
-            st.markdown(f"<small style='color: #888;'>ID: {node.node_id} | Level: {node.level}</small>",
-                       unsafe_allow_html=True)
-            st.markdown("---")
-            for child in node.children:
-                render_tree_node(child, level + 1, default_expanded)
+    """Render a tree node and its children with an explicit stack.
+
+    Expander contexts are entered manually and closed whenever the walk
+    returns to a shallower level, so nesting matches the recursive layout
+    without a Python frame per node.
+    """
+    stack: list[tuple[ValueTreeNode, int]] = [(node, level)]
+    open_expanders: list[tuple[int, ExitStack]] = []
+    try:
+        while stack:
+            current, lvl = stack.pop()
+
+            # Leaving a subtree: close expanders at this depth or deeper
+            while open_expanders and open_expanders[-1][0] >= lvl:
+                open_expanders.pop()[1].close()
+
+            icon = LEVEL_ICONS.get(current.level, DEFAULT_ICON)
+
+            # For leaf nodes or nodes without children, just display
+            if not current.children:
+                parts = [f"{icon} **{current.name}**"]
+                if current.description:
+                    parts.append(
+                        f"&nbsp;&nbsp;&nbsp;<small style='color: #666;'>{current.description}</small>"
+                    )
+                st.markdown("\n\n".join(parts), unsafe_allow_html=True)
+            else:
+                # Use expander for nodes with children; one markdown call per body
+                ctx = ExitStack()
+                ctx.enter_context(
+                    st.expander(f"{icon} {current.name}", expanded=default_expanded)
+                )
+                open_expanders.append((lvl, ctx))
+
+                header = []
+                if current.description:
+                    header.append(f"<small style='color: #666;'>{current.description}</small>")
+                header.append(
+                    f"<small style='color: #888;'>ID: {current.node_id} | Level: {current.level}</small>"
+                )
+                header.append("---")
+                st.markdown("\n\n".join(header), unsafe_allow_html=True)
+
+                # Push children in reverse so display order is preserved
+                stack.extend((child, lvl + 1) for child in reversed(current.children))
+    finally:
+        while open_expanders:
+            open_expanders.pop()[1].close()
 
 
 def render_tree_flat(node: ValueTreeNode, level: int = 0):
-    """Render tree in a flat, indented format."""
-    level_icons = {
-        "Lever": "🎯",
-        "Business_Objective": "📊",
-        "Value_Driver": "⚡",
-        "KPI": "📈"
-    }
+    """Render tree in a flat, indented format with a single markdown call."""
+    parts: list[str] = []
+    _collect_flat_lines(node, level, parts)
+    st.markdown("\n\n".join(parts), unsafe_allow_html=True)
 
-    icon = level_icons.get(node.level, "📌")
-    indent = "│   " * level
+
+def _collect_flat_lines(node: ValueTreeNode, level: int, parts: list[str]):
+    """Accumulate the flat-view markdown lines for a node and its children."""
+    icon = LEVEL_ICONS.get(node.level, DEFAULT_ICON)
+    indent = _tree_indent(level)
 
     # Display the node
     if level == 0:
-        st.markdown(f"**{icon} {node.name}**")
+        parts.append(f"**{icon} {node.name}**")
     else:
         prefix = "├── " if level > 0 else ""
-        st.markdown(f"`{indent}{prefix}`{icon} **{node.name}**")
+        parts.append(f"`{indent}{prefix}`{icon} **{node.name}**")
 
     if node.description:
-        desc_indent = "│   " * (level + 1)
-        st.markdown(f"<small style='color: #666; margin-left: 20px;'>`{desc_indent}`{node.description}</small>",
-                   unsafe_allow_html=True)
+        desc_indent = _tree_indent(level + 1)
+        parts.append(
+            f"<small style='color: #666; margin-left: 20px;'>`{desc_indent}`{node.description}</small>"
+        )
 
-    # Render children
+    # Collect children
     for child in node.children:
-        render_tree_flat(child, level + 1)
+        _collect_flat_lines(child, level + 1, parts)
 
 
 def render_visual_tree(tree: ValueTree):
     """Render the tree as a visual diagram similar to the reference image."""
 
-    # Collect nodes by level
-    levers = []
-    business_objectives = []
-    value_drivers = []
-    kpis = []
-
-    # Build parent-child mappings
-    bo_to_lever = {}
-    vd_to_bo = {}
-    kpi_to_vd = {}
-
-    def collect_nodes(tree_node, parent_id=None):
-        node = tree_node.node
-        if node.node_level == "Lever":
-            levers.append(node)
-        elif node.node_level == "Business_Objective":
-            business_objectives.append(node)
-            bo_to_lever[node.node_id] = parent_id
-        elif node.node_level == "Value_Driver":
-            value_drivers.append(node)
-            vd_to_bo[node.node_id] = parent_id
-        elif node.node_level == "KPI":
-            kpis.append(node)
-            kpi_to_vd[node.node_id] = parent_id
-
-        for child in tree_node.children:
-            collect_nodes(child, node.node_id)
-
-    for root in tree.roots:
-        collect_nodes(root)
-
-    # Group KPIs by Value Driver
-    kpis_by_vd = {}
-    for kpi in kpis:
-        vd_id = kpi_to_vd.get(kpi.node_id)
-        if vd_id not in kpis_by_vd:
-            kpis_by_vd[vd_id] = []
-        kpis_by_vd[vd_id].append(kpi)
-
-    # Group Value Drivers by Business Objective
-    vds_by_bo = {}
-    for vd in value_drivers:
-        bo_id = vd_to_bo.get(vd.node_id)
-        if bo_id not in vds_by_bo:
-            vds_by_bo[bo_id] = []
-        vds_by_bo[bo_id].append(vd)
-
-    # Group Business Objectives by Lever
-    bos_by_lever = {}
-    for bo in business_objectives:
-        lever_id = bo_to_lever.get(bo.node_id)
-        if lever_id not in bos_by_lever:
-            bos_by_lever[lever_id] = []
-        bos_by_lever[lever_id].append(bo)
-
-    # Generate HTML
-    html = """
+    # The assembler already grouped children by parent; index it directly
+    # instead of re-traversing the tree and rebuilding the grouping maps
+    levers = [root.node for root in tree.roots]
+
+    # Emit the stylesheet and column header once; each lever's subtree is
+    # built on demand inside its own expander below
+    st.markdown("""
     <style>
         .value-tree-container {
             font-family: Arial, sans-serif;
@@ -259,47 +276,76 @@ def render_visual_tree(tree: ValueTree):
             <div class="tree-header-col col-vd">Value Drivers</div>
             <div class="tree-header-col col-kpi">Operational KPI's</div>
         </div>
-    """
+    </div>
+    """, unsafe_allow_html=True)
 
     for lever in levers:
-        lever_bos = bos_by_lever.get(lever.node_id, [])
+        # Building the branch HTML inside the expander block keeps the
+        # initial render proportional to the number of Levers
+        with st.expander(f"🎯 {lever.node_name}", expanded=False):
+            st.markdown(
+                _lever_section_html(lever, tree.children_by_parent),
+                unsafe_allow_html=True
+            )
+
+
+def _lever_section_html(lever, children_by_parent) -> str:
+    """Build the BO/VD/KPI grid HTML for a single lever."""
+    parts: list[str] = ['<div class="value-tree-container">']
+    parts.append('<div class="lever-section">')
+    parts.append(LEVER_TPL.format(lever.node_name))
 
-        # Calculate total rows for this lever
-        total_vd_rows = sum(len(vds_by_bo.get(bo.node_id, [])) or 1 for bo in lever_bos) if lever_bos else 1
+    parts.append('<div class="bo-container">')
+    for bo in children_by_parent.get(lever.node_id, []):
+        bo_vds = children_by_parent.get(bo.node_id, [])
 
-        html += f'<div class="lever-section">'
-        html += f'<div class="lever-box">{lever.node_name}</div>'
+        parts.append('<div class="bo-row">')
+        parts.append(BO_TPL.format(bo.node_name))
 
-        html += '<div class="bo-container">'
-        for bo in lever_bos:
-            bo_vds = vds_by_bo.get(bo.node_id, [])
+        parts.append('<div class="vd-container">')
+        if bo_vds:
+            for vd in bo_vds:
+                vd_kpis = children_by_parent.get(vd.node_id, [])
 
-            html += '<div class="bo-row">'
-            html += f'<div class="bo-box">{bo.node_name}</div>'
+                parts.append('<div class="vd-row">')
+                parts.append(VD_TPL.format(vd.node_name))
 
-            html += '<div class="vd-container">'
-            if bo_vds:
-                for vd in bo_vds:
-                    vd_kpis = kpis_by_vd.get(vd.node_id, [])
+                parts.append('<div class="kpi-container">')
+                parts.append("".join(KPI_TPL.format(kpi.node_name) for kpi in vd_kpis))
+                parts.append('</div>')
+                parts.append('</div>')
+        parts.append('</div>')
 
-                    html += '<div class="vd-row">'
-                    html += f'<div class="vd-box">{vd.node_name}</div>'
+        parts.append('</div>')
+    parts.append('</div>')
 
-                    html += '<div class="kpi-container">'
-                    for kpi in vd_kpis:
-                        html += f'<span class="kpi-item">{kpi.node_name}</span>'
-                    html += '</div>'
-                    html += '</div>'
-            html += '</div>'
+    parts.append('</div>')
+    parts.append('</div>')
 
-            html += '</div>'
-        html += '</div>'
+    return "".join(parts)
 
-        html += '</div>'
 
-    html += '</div>'
+@st.fragment
+def _render_tree_fragment(tree: ValueTree, view_mode: str):
+    """Fragment-scoped tree render so it reruns without replaying the page."""
+    display_tree(tree, view_mode)
 
-    st.markdown(html, unsafe_allow_html=True)
+
+@st.fragment
+def _render_stats_fragment(tree: ValueTree):
+    """Fragment-scoped statistics panel."""
+    stats = get_assembler().get_statistics(tree)
+
+    st.metric("Total Nodes", stats["total_nodes"])
+
+    st.markdown("**By Level:**")
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.metric("🎯 Levers", stats["levers"])
+        st.metric("⚡ Value Drivers", stats["value_drivers"])
+    with col_b:
+        st.metric("📊 Business Objectives", stats["business_objectives"])
+        st.metric("📈 KPIs", stats["kpis"])
 
 
 def display_tree(tree: ValueTree, view_mode: str = "hierarchical_expanded"):
@@ -308,6 +354,18 @@ def display_tree(tree: ValueTree, view_mode: str = "hierarchical_expanded"):
         st.warning("No nodes match the selected criteria. Try adjusting the threshold or context.")
         return
 
+    # Very broad trees can freeze the browser; require explicit opt-in
+    if tree.node_count > MAX_RENDER_NODES and not st.session_state.get('force_large_render'):
+        st.warning(
+            f"This tree has {tree.node_count} nodes, which exceeds the "
+            f"{MAX_RENDER_NODES}-node render limit. Raise the threshold to "
+            "narrow the tree, or render it anyway."
+        )
+        if st.button("Render anyway"):
+            st.session_state['force_large_render'] = True
+            st.rerun()
+        return
+
     if view_mode == "visual":
         render_visual_tree(tree)
     elif view_mode == "hierarchical_expanded":
@@ -344,8 +402,8 @@ def main():
         st.error(f"Failed to load data from: {EXCEL_FILE_PATH}")
         st.stop()
 
-    # Create assembler
-    assembler = ValueTreeAssembler(data_loader)
+    # Version token so cached trees invalidate when the data is reloaded
+    data_version = st.session_state.setdefault('data_version', 0)
 
     # Sidebar for inputs
     st.sidebar.header("Context Selection")
@@ -353,6 +411,9 @@ def main():
     # Reload data button
     if st.sidebar.button("🔃 Reload Data", help="Reload Excel file to pick up changes"):
         load_data.clear()
+        get_assembler.clear()
+        st.session_state.pop('tree_cache', None)
+        st.session_state['data_version'] = st.session_state.get('data_version', 0) + 1
         st.rerun()
 
     # Get dropdown options
@@ -433,53 +494,41 @@ def main():
     st.sidebar.markdown(f"**Function:** {selected_function}")
     st.sidebar.markdown(f"**Threshold:** ≥ {threshold}")
 
+    # Assemble once per run; both columns read from the same tree.
+    # Session state is checked first so hits skip even the cache_data
+    # wrapper's argument hashing.
+    tree = None
+    if st.session_state.get('generate_clicked'):
+        ctx = (selected_intent, selected_industry, selected_function, threshold)
+        tree_cache = st.session_state.setdefault('tree_cache', {})
+        tree = tree_cache.get(ctx)
+        if tree is None:
+            with st.spinner("Assembling value tree..."):
+                tree = _assemble_cached(get_assembler(), *ctx, data_version)
+            tree_cache[ctx] = tree
+
     # Main content area
     col1, col2 = st.columns([3, 1])
 
     with col1:
         st.header("Value Tree")
 
-        if not st.session_state.get('generate_clicked'):
+        if tree is None:
             st.info("Select your context options and click **Generate** to build the value tree.")
-        elif st.session_state.get('generate_clicked'):
+        else:
             # Display value intent description
             intent_description = data_loader.get_value_intent_description(selected_intent)
             if intent_description:
                 st.info(f"**{selected_intent}:** {intent_description}")
 
-            with st.spinner("Assembling value tree..."):
-                tree = assembler.assemble_value_tree(
-                    value_intent=selected_intent,
-                    industry=selected_industry,
-                    function=selected_function,
-                    threshold=threshold
-                )
-
             # Display the tree
-            display_tree(tree, view_mode)
+            _render_tree_fragment(tree, view_mode)
 
     with col2:
         st.header("Statistics")
 
-        if st.session_state.get('generate_clicked'):
-            tree = assembler.assemble_value_tree(
-                value_intent=selected_intent,
-                industry=selected_industry,
-                function=selected_function,
-                threshold=threshold
-            )
-            stats = assembler.get_statistics(tree)
-
-            st.metric("Total Nodes", stats["total_nodes"])
-
-            st.markdown("**By Level:**")
-            col_a, col_b = st.columns(2)
-            with col_a:
-                st.metric("🎯 Levers", stats["levers"])
-                st.metric("⚡ Value Drivers", stats["value_drivers"])
-            with col_b:
-                st.metric("📊 Business Objectives", stats["business_objectives"])
-                st.metric("📈 KPIs", stats["kpis"])
+        if tree is not None:
+            _render_stats_fragment(tree)
 
     # Footer
     st.sidebar.markdown("---")
@@ -1,10 +1,11 @@
 """Core assembly engine for Value Tree Generator."""
 
 from typing import Optional
-from collections import defaultdict
+from collections import Counter, defaultdict
+from functools import lru_cache
 
 from config import ACTIVE_STATUS, NODE_LEVELS
-from models import Node, ValueTree, ValueTreeNode
+from models import Node, NodeTable, ValueTree, ValueTreeNode
 from data_loader import DataLoader
 
 
@@ -15,13 +16,61 @@ class ValueTreeAssembler:
         self.data_loader = data_loader
         # Build node lookup for efficient access
         self._node_lookup: dict[str, Node] = {}
+        self._active_ids: set[str] = set()
+        self._parent_ids: dict[str, Optional[str]] = {}
         self._build_node_lookup()
+        # Precompute ancestor chains since the node graph is static after load
+        self._ancestors: dict[str, tuple[str, ...]] = {}
+        self._build_ancestors()
 
     def _build_node_lookup(self):
-        """Build a lookup dictionary for nodes by ID."""
-        if self.data_loader.is_loaded:
-            for node in self.data_loader.get_all_nodes():
-                self._node_lookup[node.node_id] = node
+        """Build the node lookup plus columnar-derived active/parent tables."""
+        if not self.data_loader.is_loaded:
+            return
+
+        for node in self.data_loader.get_all_nodes():
+            self._node_lookup[node.node_id] = node
+
+        # Derive the hot-loop structures from the Node_ID-indexed frame in
+        # two column operations rather than per-object attribute access
+        nodes_df = self.data_loader.nodes_df
+        self._active_ids = set(nodes_df.index[nodes_df['Status'].eq(ACTIVE_STATUS)])
+        parents = nodes_df['Parent_Node_ID']
+        self._parent_ids = dict(zip(nodes_df.index, parents.where(parents.notna(), None)))
+
+    def _build_ancestors(self):
+        """Precompute, per node, the active IDs on its chain up to the Lever.
+
+        Each chain includes the node itself; deprecated nodes are traversed
+        but excluded from the chain, matching the per-request walk this
+        replaces.
+        """
+        def chain(node_id: str) -> tuple[str, ...]:
+            cached = self._ancestors.get(node_id)
+            if cached is not None:
+                return cached
+            if node_id not in self._parent_ids:
+                result = ()
+            else:
+                parent_id = self._parent_ids[node_id]
+                parent_chain = chain(parent_id) if parent_id else ()
+                if node_id in self._active_ids:
+                    result = (node_id,) + parent_chain
+                else:
+                    result = parent_chain
+            self._ancestors[node_id] = result
+            return result
+
+        for node_id in self._parent_ids:
+            chain(node_id)
+
+    @lru_cache(maxsize=256)
+    def _eligible_ids_for(self, value_intent: str, industry: str,
+                          function: str, threshold: int) -> tuple[str, ...]:
+        """Cache the vectorized context + threshold filter per input tuple."""
+        return tuple(self.data_loader.get_eligible_node_ids(
+            value_intent, industry, function, threshold
+        ))
 
     def assemble_value_tree(self, value_intent: str, industry: str,
                             function: str, threshold: int = 3) -> ValueTree:
@@ -38,37 +87,19 @@ class ValueTreeAssembler:
         7. Construct hierarchical structure
         8. Sort lexicographically by Node_ID
         """
-        # Step 1: Filter Context_Applicability by context
-        rules = self.data_loader.get_applicability_rules(
-            value_intent, industry, function
+        # Steps 1 & 2: vectorized context + threshold filter (cached per tuple)
+        candidate_ids = self._eligible_ids_for(
+            value_intent, industry, function, threshold
         )
 
-        # Step 2: Apply threshold filter (weight >= threshold)
-        eligible_rules = [r for r in rules if r.applicability_weight >= threshold]
-
-        # Step 3 & 4: Resolve node definitions and exclude deprecated
-        eligible_node_ids = set()
-        for rule in eligible_rules:
-            node = self._node_lookup.get(rule.node_id)
-            if node and node.status == ACTIVE_STATUS:
-                eligible_node_ids.add(rule.node_id)
-
-        # Step 5: Auto-include parent nodes (iterate up to Lever)
-        all_node_ids = set()
-        for node_id in eligible_node_ids:
-            # Add the node itself
-            all_node_ids.add(node_id)
-            # Walk up the parent chain
-            current_id = node_id
-            while current_id:
-                node = self._node_lookup.get(current_id)
-                if not node:
-                    break
-                # Only include active nodes
-                if node.status == ACTIVE_STATUS:
-                    all_node_ids.add(current_id)
-                # Move to parent
-                current_id = node.parent_node_id
+        # Steps 3 & 4: Resolve node definitions and exclude deprecated,
+        # as a single intersection with the precomputed active-ID set
+        eligible_node_ids = set(candidate_ids) & self._active_ids
+
+        # Step 5: Auto-include parent nodes via the precomputed ancestor chains
+        all_node_ids = set().union(
+            *(self._ancestors[node_id] for node_id in eligible_node_ids)
+        )
 
         # Step 6: Deduplicate by Node_ID (already using set)
         # Step 7: Construct hierarchical structure
@@ -82,6 +113,11 @@ class ValueTreeAssembler:
             "threshold": threshold
         }
         tree.node_count = len(all_node_ids)
+        tree.level_counts = Counter(
+            self._node_lookup[node_id].node_level
+            for node_id in all_node_ids
+            if node_id in self._node_lookup
+        )
 
         return tree
 
@@ -103,13 +139,24 @@ class ValueTreeAssembler:
         for parent_id in children_by_parent:
             children_by_parent[parent_id].sort(key=lambda n: n.node_id)
 
-        # Build tree recursively
-        def build_subtree(node: Node) -> ValueTreeNode:
+        # Build tree iteratively, deepest level first (KPI -> Lever), so each
+        # node's children already exist when the node itself is created
+        level_order = {level: i for i, level in enumerate(NODE_LEVELS)}
+        ordered_nodes = sorted(
+            included_nodes.values(),
+            key=lambda n: level_order.get(n.node_level, len(NODE_LEVELS)),
+            reverse=True
+        )
+
+        tree_node_by_id: dict[str, ValueTreeNode] = {}
+        for node in ordered_nodes:
             tree_node = ValueTreeNode(node=node)
-            children = children_by_parent.get(node.node_id, [])
-            for child in children:
-                tree_node.children.append(build_subtree(child))
-            return tree_node
+            tree_node.children = [
+                tree_node_by_id[child.node_id]
+                for child in children_by_parent.get(node.node_id, [])
+                if child.node_id in tree_node_by_id
+            ]
+            tree_node_by_id[node.node_id] = tree_node
 
         # Find root nodes (Levers - nodes with no parent in our set)
         roots = []
@@ -117,38 +164,26 @@ class ValueTreeAssembler:
             if node.parent_node_id is None or node.parent_node_id not in included_nodes:
                 # This is a root for our tree
                 if node.node_level == "Lever":
-                    roots.append(build_subtree(node))
+                    roots.append(tree_node_by_id[node.node_id])
 
         # Sort roots by Node_ID
         roots.sort(key=lambda tn: tn.node_id)
 
-        return ValueTree(roots=roots)
+        # Columnar table for flat traversals (get_all_nodes, exports)
+        table = NodeTable.build(
+            included_nodes, children_by_parent, [tn.node for tn in roots]
+        )
+
+        return ValueTree(roots=roots, children_by_parent=dict(children_by_parent),
+                         table=table)
 
     def get_statistics(self, tree: ValueTree) -> dict:
         """Get statistics about the assembled tree."""
-        stats = {
+        counts = tree.level_counts
+        return {
             "total_nodes": tree.node_count,
-            "levers": 0,
-            "business_objectives": 0,
-            "value_drivers": 0,
-            "kpis": 0
+            "levers": counts.get("Lever", 0),
+            "business_objectives": counts.get("Business_Objective", 0),
+            "value_drivers": counts.get("Value_Driver", 0),
+            "kpis": counts.get("KPI", 0)
         }
-
-        def count_levels(tree_node: ValueTreeNode):
-            level = tree_node.node.node_level
-            if level == "Lever":
-                stats["levers"] += 1
-            elif level == "Business_Objective":
-                stats["business_objectives"] += 1
-            elif level == "Value_Driver":
-                stats["value_drivers"] += 1
-            elif level == "KPI":
-                stats["kpis"] += 1
-
-            for child in tree_node.children:
-                count_levels(child)
-
-        for root in tree.roots:
-            count_levels(root)
-
-        return stats
@@ -1,5 +1,6 @@
 """Configuration settings for Value Tree Generator."""
 
+import sys
 from pathlib import Path
 
 # Excel file configuration
@@ -8,12 +9,21 @@ NODE_MASTER_SHEET = "Node_Master"
 CONTEXT_APPLICABILITY_SHEET = "Context_Applicability"
 VALUE_INTENT_SUMMARY_SHEET = "Value Intent_Summary"
 
+# Workbook parser: "calamine" (Rust-based, much faster) or "openpyxl".
+# Falls back to openpyxl automatically if python-calamine is not installed.
+EXCEL_ENGINE = "calamine"
+
 # Default applicability threshold (1-5 scale)
 DEFAULT_THRESHOLD = 3
 
-# Node levels in hierarchical order
-NODE_LEVELS = ["Lever", "Business_Objective", "Value_Driver", "KPI"]
+# Maximum node count rendered without explicit opt-in
+MAX_RENDER_NODES = 2000
+
+# Node levels in hierarchical order (interned so hot-loop comparisons can
+# short-circuit on identity)
+NODE_LEVELS = [sys.intern(level) for level in
+               ["Lever", "Business_Objective", "Value_Driver", "KPI"]]
 
 # Node status values
-ACTIVE_STATUS = "Active"
-DEPRECATED_STATUS = "Deprecated"
+ACTIVE_STATUS = sys.intern("Active")
+DEPRECATED_STATUS = sys.intern("Deprecated")
@@ -1,15 +1,39 @@
 """Data loading functions for Value Tree Generator."""
 
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 import pandas as pd
+from openpyxl import load_workbook
 
 from config import (
-    EXCEL_FILE_PATH, NODE_MASTER_SHEET, CONTEXT_APPLICABILITY_SHEET,
-    VALUE_INTENT_SUMMARY_SHEET, ACTIVE_STATUS
+    EXCEL_FILE_PATH, EXCEL_ENGINE, NODE_MASTER_SHEET,
+    CONTEXT_APPLICABILITY_SHEET, VALUE_INTENT_SUMMARY_SHEET, ACTIVE_STATUS
 )
 from models import Node, ApplicabilityRule
-from validators import validate_all, ValidationError
+from validators import (
+    validate_all, ValidationError,
+    NODE_MASTER_REQUIRED_COLUMNS, CONTEXT_APPLICABILITY_REQUIRED_COLUMNS
+)
+
+# python-calamine is optional: when installed (and selected via
+# EXCEL_ENGINE) its Rust parser replaces openpyxl's XML tree walking
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Columns actually consumed per sheet; anything else is dropped at read
+# time so unused columns never take up memory
+SHEET_USECOLS = {
+    NODE_MASTER_SHEET: NODE_MASTER_REQUIRED_COLUMNS,
+    CONTEXT_APPLICABILITY_SHEET: (
+        CONTEXT_APPLICABILITY_REQUIRED_COLUMNS + ["Mandatory_Flag", "Notes"]
+    ),
+    VALUE_INTENT_SUMMARY_SHEET: ["Value_Intent", "Description"],
+}
 
 
 class DataLoader:
@@ -18,33 +42,308 @@ class DataLoader:
     def __init__(self, excel_path: Optional[Path] = None):
         self.excel_path = excel_path or EXCEL_FILE_PATH
         self._node_master_df: Optional[pd.DataFrame] = None
+        self._nodes_df: Optional[pd.DataFrame] = None
         self._context_df: Optional[pd.DataFrame] = None
+        self._context_by_key: Optional[pd.DataFrame] = None
+        self._all_nodes: list[Node] = []
+        self._nodes_by_id: dict[str, Node] = {}
+        self._unique_value_intents: list[str] = []
+        self._unique_industries: list[str] = []
+        self._unique_functions: list[str] = []
         self._value_intent_summary_df: Optional[pd.DataFrame] = None
         self._validation_errors: list[str] = []
+        self._vi_desc: dict[str, str] = {}
         self._loaded = False
+        # Lazily populated per-sheet state: sheets are read on first
+        # access, not when the loader is constructed
+        self._sheets: dict[str, pd.DataFrame] = {}
+        self._sheet_names: Optional[list[str]] = None
+        self._workbook = None
+
+    @property
+    def _cache_dir(self) -> Path:
+        """Directory holding the Parquet warm-start cache for this workbook."""
+        return self.excel_path.with_suffix('.cache')
+
+    def _cache_is_fresh(self) -> bool:
+        """True when the Parquet cache covers both required sheets and is
+        newer than the workbook."""
+        try:
+            xlsx_mtime = os.path.getmtime(self.excel_path)
+        except OSError:
+            return False
+        if not self._cache_dir.is_dir():
+            return False
+        for name in (NODE_MASTER_SHEET, CONTEXT_APPLICABILITY_SHEET):
+            path = self._cache_dir / f"{name}.parquet"
+            try:
+                if os.path.getmtime(path) <= xlsx_mtime:
+                    return False  # stale cache; re-read the workbook
+            except OSError:
+                return False
+        return True
+
+    def _read_cached_sheet(self, name: str) -> Optional[pd.DataFrame]:
+        """Read one sheet from the Parquet cache if it is fresh."""
+        if not self._cache_is_fresh():
+            return None
+        path = self._cache_dir / f"{name}.parquet"
+        if not path.exists():
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            return None
+
+    def _write_sheet_cache(self, name: str, df: pd.DataFrame):
+        """Best-effort write of one sheet to the Parquet warm-start cache."""
+        try:
+            self._cache_dir.mkdir(exist_ok=True)
+            df.to_parquet(self._cache_dir / f"{name}.parquet")
+        except Exception:
+            # Cache is purely an optimization; never fail the load for it
+            pass
+
+    @staticmethod
+    def _use_calamine() -> bool:
+        """True when the calamine engine is both selected and installed."""
+        return EXCEL_ENGINE == "calamine" and CalamineWorkbook is not None
+
+    def _open_workbook(self):
+        """Open the workbook with the configured engine.
+
+        With openpyxl, read_only/data_only skips styling and formula
+        graphs, which dominate load time on large sheets.
+        """
+        if self._use_calamine():
+            return CalamineWorkbook.from_path(self.excel_path)
+        return load_workbook(self.excel_path, read_only=True, data_only=True)
+
+    def _ensure_workbook(self):
+        """Open the workbook on first demand and keep the handle for
+        subsequent sheet reads."""
+        if self._workbook is None:
+            self._workbook = self._open_workbook()
+        return self._workbook
+
+    def _close_workbook(self):
+        """Release the workbook handle once the needed sheets are read."""
+        if self._workbook is not None:
+            close = getattr(self._workbook, 'close', None)
+            if close is not None:
+                close()
+            self._workbook = None
+
+    @staticmethod
+    def _workbook_sheet_names(workbook) -> list[str]:
+        """Sheet names for either engine's workbook object."""
+        names = getattr(workbook, 'sheetnames', None)  # openpyxl
+        if names is None:
+            names = workbook.sheet_names  # calamine
+        return list(names)
+
+    def _workbook_sheet_frame(self, workbook, name: str) -> pd.DataFrame:
+        """Build a DataFrame from one sheet of either engine's workbook."""
+        if CalamineWorkbook is not None and isinstance(workbook, CalamineWorkbook):
+            rows = workbook.get_sheet_by_name(name).to_python(skip_empty_area=True)
+            frame = self._rows_to_frame(iter(rows))
+            # calamine reports empty cells as "", openpyxl as None; mask
+            # back to NaN so validation and conversions see the same shape
+            return frame.mask(frame == "")
+        return self._worksheet_to_frame(workbook[name])
+
+    def _get_sheet_names(self) -> list[str]:
+        """Return the workbook's sheet names, from the cache when fresh."""
+        if self._sheet_names is None:
+            if self._workbook is None and self._cache_is_fresh():
+                self._sheet_names = [
+                    name for name in SHEET_USECOLS
+                    if (self._cache_dir / f"{name}.parquet").exists()
+                ]
+            else:
+                self._sheet_names = self._workbook_sheet_names(
+                    self._ensure_workbook())
+        return self._sheet_names
+
+    def _get_sheet(self, name: str) -> Optional[pd.DataFrame]:
+        """Read one sheet on first access, preferring the Parquet cache.
+
+        Returns None when the sheet does not exist; validation reports
+        missing required sheets.
+        """
+        if name in self._sheets:
+            return self._sheets[name]
+
+        df = self._read_cached_sheet(name)
+        if df is None:
+            if name not in self._get_sheet_names():
+                return None
+            df = self._workbook_sheet_frame(self._ensure_workbook(), name)
+            self._write_sheet_cache(name, df)
+
+        df = self._prune_columns(name, df)
+        self._sheets[name] = df
+        return df
+
+    @staticmethod
+    def _prune_columns(name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Keep only the columns this app consumes from a sheet.
+
+        Missing required columns are left missing so validation still
+        reports them.
+        """
+        usecols = SHEET_USECOLS.get(name)
+        if usecols is None:
+            return df
+        keep = [column for column in usecols if column in df.columns]
+        return df[keep]
+
+    @staticmethod
+    def _convert_node_master(df: pd.DataFrame) -> pd.DataFrame:
+        """Vectorized post-validation conversions for Node_Master."""
+        return df.assign(
+            # object dtype so the fill value stays None (string dtypes
+            # would silently turn it back into NaN)
+            Parent_Node_ID=df['Parent_Node_ID'].astype(object).where(
+                df['Parent_Node_ID'].notna(), None),
+            Description=df['Description'].fillna(""),
+            Is_Leaf=df['Is_Leaf'].fillna(False).astype(bool),
+            Status=df['Status'].fillna(ACTIVE_STATUS),
+        )
+
+    @staticmethod
+    def _convert_context(df: pd.DataFrame) -> pd.DataFrame:
+        """Vectorized post-validation conversions for Context_Applicability.
+
+        Also fills in the optional columns so downstream code needs no
+        presence checks.
+        """
+        converted = {
+            'Applicability_Weight': pd.to_numeric(
+                df['Applicability_Weight'], errors='coerce'
+            ).fillna(0).astype(int),
+        }
+        if 'Mandatory_Flag' in df.columns:
+            converted['Mandatory_Flag'] = df['Mandatory_Flag'].fillna(False).astype(bool)
+        else:
+            converted['Mandatory_Flag'] = False
+        if 'Notes' in df.columns:
+            converted['Notes'] = df['Notes'].fillna("")
+        else:
+            converted['Notes'] = ""
+        return df.assign(**converted)
+
+    @classmethod
+    def _worksheet_to_frame(cls, worksheet) -> pd.DataFrame:
+        """Build a DataFrame from an openpyxl worksheet."""
+        return cls._rows_to_frame(worksheet.values)
+
+    @staticmethod
+    def _rows_to_frame(rows) -> pd.DataFrame:
+        """Build a DataFrame from a row iterator, first row as columns."""
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        return pd.DataFrame(rows, columns=header)
+
+    def _read_worksheet_standalone(self, name: str) -> tuple[
+            list[str], Optional[pd.DataFrame]]:
+        """Read one sheet through a private workbook handle.
+
+        Used by the parallel prefetch path; each worker gets its own
+        handle so the zip reads never contend on a shared file object.
+        """
+        workbook = self._open_workbook()
+        try:
+            sheet_names = self._workbook_sheet_names(workbook)
+            if name not in sheet_names:
+                return sheet_names, None
+            return sheet_names, self._workbook_sheet_frame(workbook, name)
+        finally:
+            close = getattr(workbook, 'close', None)
+            if close is not None:
+                close()
+
+    def _prefetch_sheets(self):
+        """Read all still-missing sheets in parallel.
+
+        Worksheet XML decompression releases the GIL, so the two-three
+        sheet reads overlap instead of running back to back. Skipped
+        when the Parquet cache is fresh (those reads are already cheap)
+        or when at most one sheet is missing.
+        """
+        if self._cache_is_fresh():
+            return
+        missing = [name for name in SHEET_USECOLS if name not in self._sheets]
+        if len(missing) < 2:
+            return
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                name: executor.submit(self._read_worksheet_standalone, name)
+                for name in missing
+            }
+        for name, future in futures.items():
+            sheet_names, df = future.result()
+            if self._sheet_names is None:
+                self._sheet_names = sheet_names
+            if df is not None:
+                self._write_sheet_cache(name, df)
+                self._sheets[name] = self._prune_columns(name, df)
+
+    def validate(self) -> list[str]:
+        """Read any sheets not yet loaded and run all validations.
+
+        Reads go through the lazy per-sheet path, so sheets already
+        pulled by earlier accesses are not re-parsed.
+        """
+        self._prefetch_sheets()
+        self._node_master_df = self._get_sheet(NODE_MASTER_SHEET)
+        self._context_df = self._get_sheet(CONTEXT_APPLICABILITY_SHEET)
+        self._value_intent_summary_df = self._get_sheet(VALUE_INTENT_SUMMARY_SHEET)
+
+        self._validation_errors = validate_all(
+            self._get_sheet_names(), self._node_master_df, self._context_df
+        )
+        return self._validation_errors
 
     def load(self) -> bool:
         """Load data from Excel file. Returns True if successful."""
         try:
-            excel_file = pd.ExcelFile(self.excel_path)
+            if self.validate():
+                return False
 
-            # Load sheets
-            self._node_master_df = pd.read_excel(excel_file, NODE_MASTER_SHEET)
-            self._context_df = pd.read_excel(excel_file, CONTEXT_APPLICABILITY_SHEET)
+            # Normalize NaN and flag columns once so the row loops and
+            # lookups below need no per-field conversions
+            self._node_master_df = self._convert_node_master(self._node_master_df)
+            self._context_df = self._convert_context(self._context_df)
 
-            # Load optional Value Intent Summary sheet
-            if VALUE_INTENT_SUMMARY_SHEET in excel_file.sheet_names:
-                self._value_intent_summary_df = pd.read_excel(
-                    excel_file, VALUE_INTENT_SUMMARY_SHEET
-                )
+            # Node_ID-indexed view for columnar (per-attribute) access
+            self._nodes_df = self._node_master_df.set_index('Node_ID', drop=False)
 
-            # Validate data
-            self._validation_errors = validate_all(
-                excel_file, self._node_master_df, self._context_df
-            )
+            # Sorted MultiIndex on the context columns for O(log N) lookups
+            self._context_by_key = self._context_df.set_index(
+                ['Value_Intent', 'Industry', 'Function']
+            ).sort_index()
 
-            if self._validation_errors:
-                return False
+            # Materialize Node objects once; lookups become dict gets
+            self._all_nodes = self._build_all_nodes()
+            self._nodes_by_id = {node.node_id: node for node in self._all_nodes}
+
+            # Dropdown option lists are invariant after load; compute once
+            self._unique_value_intents = sorted(
+                self._context_df['Value_Intent'].dropna().unique().tolist())
+            self._unique_industries = sorted(
+                self._context_df['Industry'].dropna().unique().tolist())
+            self._unique_functions = sorted(
+                self._context_df['Function'].dropna().unique().tolist())
+
+            # Value-intent descriptions become a plain dict lookup
+            if self._value_intent_summary_df is not None:
+                summary = self._value_intent_summary_df.dropna(
+                    subset=['Value_Intent', 'Description'])
+                self._vi_desc = dict(zip(summary['Value_Intent'],
+                                         summary['Description']))
 
             self._loaded = True
             return True
@@ -55,6 +354,8 @@ class DataLoader:
         except Exception as e:
             self._validation_errors = [f"Error loading Excel file: {str(e)}"]
             return False
+        finally:
+            self._close_workbook()
 
     @property
     def validation_errors(self) -> list[str]:
@@ -73,6 +374,13 @@ class DataLoader:
             raise ValidationError("Data not loaded. Call load() first.")
         return self._node_master_df
 
+    @property
+    def nodes_df(self) -> pd.DataFrame:
+        """Return Node_Master indexed by Node_ID for columnar lookups."""
+        if not self._loaded:
+            raise ValidationError("Data not loaded. Call load() first.")
+        return self._nodes_df
+
     @property
     def context_df(self) -> pd.DataFrame:
         """Return Context_Applicability DataFrame."""
@@ -81,99 +389,118 @@ class DataLoader:
         return self._context_df
 
     def get_unique_value_intents(self) -> list[str]:
-        """Extract unique Value_Intent values for dropdown."""
+        """Extract unique Value_Intent values for dropdown (computed once)."""
         if not self._loaded:
             return []
-        values = self._context_df['Value_Intent'].dropna().unique().tolist()
-        return sorted(values)
+        return self._unique_value_intents
 
     def get_value_intent_description(self, value_intent: str) -> Optional[str]:
-        """Get the description for a specific value intent."""
-        if not self._loaded or self._value_intent_summary_df is None:
-            return None
-        row = self._value_intent_summary_df[
-            self._value_intent_summary_df['Value_Intent'] == value_intent
-        ]
-        if row.empty:
+        """Get the description for a specific value intent (O(1) lookup)."""
+        if not self._loaded:
             return None
-        description = row.iloc[0]['Description']
-        return description if pd.notna(description) else None
+        return self._vi_desc.get(value_intent)
 
     def get_unique_industries(self) -> list[str]:
-        """Extract unique Industry values for dropdown."""
+        """Extract unique Industry values for dropdown (computed once)."""
         if not self._loaded:
             return []
-        values = self._context_df['Industry'].dropna().unique().tolist()
-        return sorted(values)
+        return self._unique_industries
 
     def get_unique_functions(self) -> list[str]:
-        """Extract unique Function values for dropdown."""
+        """Extract unique Function values for dropdown (computed once)."""
         if not self._loaded:
             return []
-        values = self._context_df['Function'].dropna().unique().tolist()
-        return sorted(values)
+        return self._unique_functions
 
     def get_node_by_id(self, node_id: str) -> Optional[Node]:
-        """Get a Node object by its ID."""
+        """Get a Node object by its ID (O(1) dict lookup)."""
         if not self._loaded:
             return None
-
-        row = self._node_master_df[self._node_master_df['Node_ID'] == node_id]
-        if row.empty:
-            return None
-
-        row = row.iloc[0]
-        return Node(
-            node_id=row['Node_ID'],
-            node_name=row['Node_Name'],
-            node_level=row['Node_Level'],
-            parent_node_id=row['Parent_Node_ID'] if pd.notna(row['Parent_Node_ID']) else None,
-            description=row['Description'] if pd.notna(row['Description']) else "",
-            is_leaf=bool(row['Is_Leaf']) if pd.notna(row['Is_Leaf']) else False,
-            status=row['Status'] if pd.notna(row['Status']) else ACTIVE_STATUS
-        )
+        return self._nodes_by_id.get(node_id)
 
     def get_all_nodes(self) -> list[Node]:
-        """Get all nodes from Node_Master."""
+        """Get all nodes from Node_Master (materialized once at load)."""
         if not self._loaded:
             return []
+        return self._all_nodes
+
+    def _build_all_nodes(self) -> list[Node]:
+        """Materialize Node objects for every Node_Master row.
+
+        Columns were normalized at load time, so the loop is pure tuple
+        unpacking plus string interning.
+        """
+        frame = self._node_master_df[[
+            'Node_ID', 'Node_Name', 'Node_Level', 'Parent_Node_ID',
+            'Description', 'Is_Leaf', 'Status'
+        ]]
 
         nodes = []
-        for _, row in self._node_master_df.iterrows():
+        for nid, name, level, parent, desc, leaf, status in frame.itertuples(
+                index=False, name=None):
             nodes.append(Node(
-                node_id=row['Node_ID'],
-                node_name=row['Node_Name'],
-                node_level=row['Node_Level'],
-                parent_node_id=row['Parent_Node_ID'] if pd.notna(row['Parent_Node_ID']) else None,
-                description=row['Description'] if pd.notna(row['Description']) else "",
-                is_leaf=bool(row['Is_Leaf']) if pd.notna(row['Is_Leaf']) else False,
-                status=row['Status'] if pd.notna(row['Status']) else ACTIVE_STATUS
+                node_id=sys.intern(nid),
+                node_name=name,
+                node_level=sys.intern(level),
+                parent_node_id=sys.intern(parent) if parent is not None else None,
+                description=desc,
+                is_leaf=leaf,
+                status=sys.intern(status)
             ))
         return nodes
 
+    def get_eligible_node_ids(self, value_intent: str, industry: str,
+                              function: str, threshold: int) -> list[str]:
+        """Get node IDs whose rules match the context with weight >= threshold.
+
+        Runs as a single vectorized boolean mask over the applicability
+        table instead of materializing rule objects.
+        """
+        sub = self._context_rows(value_intent, industry, function)
+        if sub is None:
+            return []
+        return sub.loc[
+            sub['Applicability_Weight'] >= threshold, 'Node_ID'
+        ].dropna().tolist()
+
+    def _context_rows(self, value_intent: str, industry: str,
+                      function: str) -> Optional[pd.DataFrame]:
+        """Look up the context's rows via the MultiIndex; None if no match."""
+        if not self._loaded:
+            return None
+        try:
+            sub = self._context_by_key.loc[(value_intent, industry, function)]
+        except KeyError:
+            return None
+        if isinstance(sub, pd.Series):
+            # Single matching row comes back as a Series
+            sub = sub.to_frame().T
+        return sub
+
     def get_applicability_rules(self, value_intent: str, industry: str,
                                 function: str) -> list[ApplicabilityRule]:
         """Get applicability rules matching the given context."""
-        if not self._loaded:
+        # Filter by context via the MultiIndex lookup
+        filtered = self._context_rows(value_intent, industry, function)
+        if filtered is None:
             return []
 
-        # Filter by context
-        filtered = self._context_df[
-            (self._context_df['Value_Intent'] == value_intent) &
-            (self._context_df['Industry'] == industry) &
-            (self._context_df['Function'] == function)
-        ]
+        # Columns were normalized at load time, so the row loop is pure
+        # tuple unpacking with no per-field pandas calls
+        sub = filtered[['Applicability_ID', 'Node_ID', 'Applicability_Weight',
+                        'Mandatory_Flag', 'Notes']]
 
         rules = []
-        for _, row in filtered.iterrows():
+        for app_id, node_id, weight, mandatory, notes in \
+                sub.itertuples(index=False, name=None):
             rules.append(ApplicabilityRule(
-                applicability_id=row['Applicability_ID'],
-                node_id=row['Node_ID'],
-                value_intent=row['Value_Intent'],
-                industry=row['Industry'],
-                function=row['Function'],
-                applicability_weight=int(row['Applicability_Weight']) if pd.notna(row['Applicability_Weight']) else 0,
-                mandatory_flag=bool(row['Mandatory_Flag']) if pd.notna(row.get('Mandatory_Flag')) else False,
-                notes=row['Notes'] if pd.notna(row.get('Notes')) else ""
+                applicability_id=app_id,
+                node_id=node_id,
+                value_intent=value_intent,
+                industry=industry,
+                function=function,
+                applicability_weight=weight,
+                mandatory_flag=mandatory,
+                notes=notes
             ))
         return rules
@@ -3,10 +3,17 @@
 from dataclasses import dataclass, field
 from typing import Optional
 
+import numpy as np
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Node:
-    """Represents a node in the value tree hierarchy."""
+    """Represents a node in the value tree hierarchy.
+
+    Frozen so the dataclass-generated __eq__/__hash__ are used; Node_IDs
+    are validated unique, so field-wise equality matches the previous
+    node_id-only semantics.
+    """
     node_id: str
     node_name: str
     node_level: str
@@ -15,16 +22,8 @@ class Node:
     is_leaf: bool
     status: str
 
-    def __hash__(self):
-        return hash(self.node_id)
-
-    def __eq__(self, other):
-        if isinstance(other, Node):
-            return self.node_id == other.node_id
-        return False
 
-
-@dataclass
+@dataclass(slots=True)
 class ApplicabilityRule:
     """Represents an applicability rule from Context_Applicability sheet."""
     applicability_id: str
@@ -37,7 +36,7 @@ class ApplicabilityRule:
     notes: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ValueTreeNode:
     """Represents a node in the assembled value tree with children."""
     node: Node
@@ -60,22 +59,89 @@ class ValueTreeNode:
         return self.node.description
 
 
-@dataclass
+@dataclass(slots=True)
+class NodeTable:
+    """Columnar (structure-of-arrays) view of an assembled tree.
+
+    Per-attribute arrays share a common row order, and the parent/child
+    relation is stored CSR-style (child_offsets/child_indices), so flat
+    traversals scan contiguous arrays instead of chasing per-object
+    pointers.
+    """
+    nodes: list[Node]
+    ids: np.ndarray
+    levels: np.ndarray
+    parents: np.ndarray
+    is_leaf: np.ndarray
+    child_offsets: np.ndarray
+    child_indices: np.ndarray
+    root_indices: np.ndarray
+
+    @classmethod
+    def build(cls, nodes_by_id: dict[str, Node],
+              children_by_parent: dict[Optional[str], list[Node]],
+              root_nodes: list[Node]) -> 'NodeTable':
+        """Build the table from the assembler's grouped structures."""
+        order = sorted(nodes_by_id)
+        index_of = {node_id: i for i, node_id in enumerate(order)}
+        nodes = [nodes_by_id[node_id] for node_id in order]
+
+        child_offsets = np.zeros(len(order) + 1, dtype=np.int32)
+        child_indices: list[int] = []
+        for i, node_id in enumerate(order):
+            children = [
+                index_of[child.node_id]
+                for child in children_by_parent.get(node_id, [])
+                if child.node_id in index_of
+            ]
+            child_indices.extend(children)
+            child_offsets[i + 1] = len(child_indices)
+
+        return cls(
+            nodes=nodes,
+            ids=np.array(order, dtype=object),
+            levels=np.array([n.node_level for n in nodes], dtype=object),
+            parents=np.array([n.parent_node_id for n in nodes], dtype=object),
+            is_leaf=np.array([n.is_leaf for n in nodes], dtype=bool),
+            child_offsets=child_offsets,
+            child_indices=np.array(child_indices, dtype=np.int32),
+            root_indices=np.array(
+                [index_of[n.node_id] for n in root_nodes], dtype=np.int32
+            ),
+        )
+
+    def all_nodes(self) -> list[Node]:
+        """Return the nodes reachable from the roots in display order."""
+        nodes: list[Node] = []
+        stack = list(self.root_indices)[::-1]
+        while stack:
+            i = stack.pop()
+            nodes.append(self.nodes[i])
+            start, end = self.child_offsets[i], self.child_offsets[i + 1]
+            stack.extend(self.child_indices[start:end][::-1])
+        return nodes
+
+
+@dataclass(slots=True)
 class ValueTree:
     """Represents the complete assembled value tree."""
     roots: list[ValueTreeNode] = field(default_factory=list)
     context: dict = field(default_factory=dict)
     node_count: int = 0
+    level_counts: dict[str, int] = field(default_factory=dict)
+    children_by_parent: dict[Optional[str], list[Node]] = field(default_factory=dict)
+    table: Optional[NodeTable] = None
 
     def get_all_nodes(self) -> list[Node]:
         """Return all nodes in the tree as a flat list."""
-        nodes = []
+        if self.table is not None:
+            return self.table.all_nodes()
 
-        def collect(tree_node: ValueTreeNode):
+        # Fallback: iterative DFS over the object tree (no frame per node)
+        nodes = []
+        stack = list(reversed(self.roots))
+        while stack:
+            tree_node = stack.pop()
             nodes.append(tree_node.node)
-            for child in tree_node.children:
-                collect(child)
-
-        for root in self.roots:
-            collect(root)
+            stack.extend(reversed(tree_node.children))
         return nodes
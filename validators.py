@@ -1,10 +1,18 @@
 """Validation functions for Value Tree Generator."""
 
 from typing import Optional
+import numpy as np
 import pandas as pd
 
 from config import NODE_MASTER_SHEET, CONTEXT_APPLICABILITY_SHEET, ACTIVE_STATUS
 
+# numba is optional: when available the cycle walk is compiled, otherwise
+# the same function runs as plain Python
+try:
+    import numba
+except ImportError:
+    numba = None
+
 # Required columns for each sheet
 NODE_MASTER_REQUIRED_COLUMNS = [
     "Node_ID", "Node_Name", "Node_Level", "Parent_Node_ID",
@@ -22,10 +30,9 @@ class ValidationError(Exception):
     pass
 
 
-def validate_sheets_exist(excel_file: pd.ExcelFile) -> list[str]:
-    """Verify both required sheets exist in the Excel file."""
+def validate_sheets_exist(sheet_names: list[str]) -> list[str]:
+    """Verify both required sheets exist in the workbook."""
     errors = []
-    sheet_names = excel_file.sheet_names
 
     if NODE_MASTER_SHEET not in sheet_names:
         errors.append(f"Missing required sheet: '{NODE_MASTER_SHEET}'")
@@ -50,41 +57,47 @@ def validate_required_columns(df: pd.DataFrame, required_columns: list[str],
     return errors
 
 
-def validate_node_master(df: pd.DataFrame) -> list[str]:
-    """Validate Node_Master sheet data integrity."""
+def validate_node_master(df: pd.DataFrame, unique_ids: np.ndarray,
+                         counts: np.ndarray) -> list[str]:
+    """Validate Node_Master sheet data integrity.
+
+    `unique_ids`/`counts` come from validate_all's single np.unique pass
+    over Node_ID, shared with the Context_Applicability checks.
+    """
     errors = []
 
-    # Check Node_ID uniqueness
-    duplicates = df[df.duplicated(subset=['Node_ID'], keep=False)]
-    if not duplicates.empty:
-        dup_ids = duplicates['Node_ID'].unique().tolist()
+    # Check Node_ID uniqueness from the shared unique counts
+    dup_ids = unique_ids[counts > 1].tolist()
+    if dup_ids:
         errors.append(f"Duplicate Node_IDs found: {dup_ids}")
 
-    # Build lookup for validation
-    node_ids = set(df['Node_ID'].dropna().tolist())
-
-    # Validate Parent_Node_ID references (non-Lever nodes must have valid parent)
-    for idx, row in df.iterrows():
-        node_id = row['Node_ID']
-        parent_id = row['Parent_Node_ID']
-        node_level = row['Node_Level']
-
-        # Levers should have no parent
-        if node_level == "Lever":
-            if pd.notna(parent_id):
-                errors.append(
-                    f"Lever node '{node_id}' should not have a Parent_Node_ID"
-                )
-        else:
-            # Non-Lever nodes must have a valid parent
-            if pd.isna(parent_id):
-                errors.append(
-                    f"Non-Lever node '{node_id}' is missing Parent_Node_ID"
-                )
-            elif parent_id not in node_ids:
-                errors.append(
-                    f"Node '{node_id}' references non-existent parent '{parent_id}'"
-                )
+    # Validate Parent_Node_ID references with vectorized masks; error
+    # strings are only formatted for the offending rows
+    is_lever = df['Node_Level'].eq("Lever")
+    has_parent = df['Parent_Node_ID'].notna()
+
+    # Levers should have no parent
+    errors.extend(
+        f"Lever node '{node_id}' should not have a Parent_Node_ID"
+        for node_id in df.loc[is_lever & has_parent, 'Node_ID']
+    )
+
+    # Non-Lever nodes must have a valid parent
+    errors.extend(
+        f"Non-Lever node '{node_id}' is missing Parent_Node_ID"
+        for node_id in df.loc[~is_lever & ~has_parent, 'Node_ID']
+    )
+
+    # Parent membership as one np.isin pass against the unique-ID array
+    parent_known = np.isin(df['Parent_Node_ID'].to_numpy(), unique_ids)
+    bad_refs = df.loc[
+        ~is_lever & has_parent & ~parent_known,
+        ['Node_ID', 'Parent_Node_ID']
+    ]
+    errors.extend(
+        f"Node '{node_id}' references non-existent parent '{parent_id}'"
+        for node_id, parent_id in bad_refs.itertuples(index=False, name=None)
+    )
 
     # Check for circular dependencies
     circular_errors = check_circular_dependencies(df)
@@ -93,75 +106,115 @@ def validate_node_master(df: pd.DataFrame) -> list[str]:
     return errors
 
 
+def _cycle_start_indices(parent_idx: np.ndarray) -> np.ndarray:
+    """Color-marking parent walk over integerized node indices.
+
+    Returns the index where each cycle loops back on itself. Written
+    against int arrays only so numba can compile it unchanged.
+    """
+    n = parent_idx.shape[0]
+    # 0 = unvisited, 1 = on current path, 2 = fully explored
+    color = np.zeros(n, dtype=np.int8)
+    starts = np.empty(n, dtype=np.int32)
+    found = 0
+
+    for start in range(n):
+        if color[start] != 0:
+            continue
+
+        current = start
+        while current != -1 and color[current] == 0:
+            color[current] = 1
+            current = parent_idx[current]
+
+        # Walking onto an on-path node means the current path loops back
+        if current != -1 and color[current] == 1:
+            starts[found] = current
+            found += 1
+
+        node = start
+        while node != -1 and color[node] == 1:
+            color[node] = 2
+            node = parent_idx[node]
+
+    return starts[:found]
+
+
+if numba is not None:
+    _cycle_start_indices = numba.njit(cache=True)(_cycle_start_indices)
+
+
 def check_circular_dependencies(df: pd.DataFrame) -> list[str]:
-    """Check for circular dependencies in the node hierarchy."""
-    errors = []
+    """Check for circular dependencies in the node hierarchy.
 
-    # Build parent lookup
-    parent_lookup = {}
-    for _, row in df.iterrows():
-        node_id = row['Node_ID']
-        parent_id = row['Parent_Node_ID']
-        if pd.notna(parent_id):
-            parent_lookup[node_id] = parent_id
-
-    # Check each node for circular path
-    for node_id in parent_lookup.keys():
-        visited = set()
-        current = node_id
-
-        while current in parent_lookup:
-            if current in visited:
-                errors.append(f"Circular dependency detected involving node '{node_id}'")
-                break
-            visited.add(current)
-            current = parent_lookup[current]
+    Integerizes the Node_ID -> Parent_Node_ID relation into an int32
+    array and runs a color-marking walk over it (compiled via numba
+    when installed), so every node is visited once with no per-step
+    dict probes.
+    """
+    ids = df['Node_ID'].tolist()
+    parents = df['Parent_Node_ID'].to_numpy()
 
-    return errors
+    id2idx = {node_id: i for i, node_id in enumerate(ids)}
+    parent_idx = np.full(len(ids), -1, dtype=np.int32)
+    for i, parent_id in enumerate(parents):
+        # NaN parents skipped via the self-inequality check
+        if parent_id is not None and parent_id == parent_id:
+            parent_idx[i] = id2idx.get(parent_id, -1)
+
+    return [
+        f"Circular dependency detected involving node '{ids[i]}'"
+        for i in _cycle_start_indices(parent_idx)
+    ]
 
 
 def validate_context_applicability(df: pd.DataFrame,
-                                   valid_node_ids: set[str]) -> list[str]:
+                                   valid_node_ids: np.ndarray) -> list[str]:
     """Validate Context_Applicability sheet data integrity."""
     errors = []
 
-    # Check all Node_IDs exist in Node_Master
-    for idx, row in df.iterrows():
-        node_id = row['Node_ID']
-        if pd.notna(node_id) and node_id not in valid_node_ids:
-            errors.append(
-                f"Context_Applicability row {idx + 2} references "
-                f"non-existent Node_ID '{node_id}'"
-            )
-
-    # Validate Applicability_Weight is numeric and in valid range
-    for idx, row in df.iterrows():
-        weight = row['Applicability_Weight']
-        if pd.notna(weight):
-            try:
-                weight_val = int(weight)
-                if weight_val < 1 or weight_val > 5:
-                    errors.append(
-                        f"Context_Applicability row {idx + 2}: "
-                        f"Applicability_Weight must be between 1 and 5, got {weight_val}"
-                    )
-            except (ValueError, TypeError):
-                errors.append(
-                    f"Context_Applicability row {idx + 2}: "
-                    f"Invalid Applicability_Weight value '{weight}'"
-                )
+    # Check all Node_IDs exist in Node_Master (vectorized membership test)
+    bad_nodes = df.loc[
+        df['Node_ID'].notna() & ~df['Node_ID'].isin(valid_node_ids), 'Node_ID'
+    ]
+    errors.extend(
+        f"Context_Applicability row {idx + 2} references "
+        f"non-existent Node_ID '{node_id}'"
+        for idx, node_id in zip(bad_nodes.index.to_numpy(),
+                                bad_nodes.to_numpy())
+    )
+
+    # Validate Applicability_Weight is numeric and in valid range; coerce
+    # once, then format messages only for the offending rows
+    raw_weights = df['Applicability_Weight']
+    weights = pd.to_numeric(raw_weights, errors='coerce')
+
+    invalid = raw_weights[raw_weights.notna() & weights.isna()]
+    errors.extend(
+        f"Context_Applicability row {idx + 2}: "
+        f"Invalid Applicability_Weight value '{weight}'"
+        for idx, weight in zip(invalid.index.to_numpy(), invalid.to_numpy())
+    )
+
+    out_of_range = weights[weights.notna() & ((weights < 1) | (weights > 5))]
+    errors.extend(
+        f"Context_Applicability row {idx + 2}: "
+        f"Applicability_Weight must be between 1 and 5, got {int(weight)}"
+        for idx, weight in zip(out_of_range.index.to_numpy(),
+                               out_of_range.to_numpy())
+    )
 
     return errors
 
 
-def validate_all(excel_file: pd.ExcelFile,
+def validate_all(sheet_names: list[str],
                  node_master_df: pd.DataFrame,
                  context_df: pd.DataFrame) -> list[str]:
     """Run all validations and return list of errors."""
     all_errors = []
 
     # Check sheets exist
-    all_errors.extend(validate_sheets_exist(excel_file))
+    all_errors.extend(validate_sheets_exist(sheet_names))
     if all_errors:
         return all_errors  # Can't proceed if sheets missing
 
@@ -177,11 +230,14 @@ def validate_all(excel_file: pd.ExcelFile,
     if all_errors:
         return all_errors  # Can't proceed if columns missing
 
+    # Materialize the Node_ID array once; both validators share it
+    node_id_arr = node_master_df['Node_ID'].dropna().to_numpy()
+    unique_ids, counts = np.unique(node_id_arr, return_counts=True)
+
     # Validate Node_Master
-    all_errors.extend(validate_node_master(node_master_df))
+    all_errors.extend(validate_node_master(node_master_df, unique_ids, counts))
 
     # Validate Context_Applicability
-    valid_node_ids = set(node_master_df['Node_ID'].dropna().tolist())
-    all_errors.extend(validate_context_applicability(context_df, valid_node_ids))
+    all_errors.extend(validate_context_applicability(context_df, unique_ids))
 
     return all_errors